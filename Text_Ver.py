@@ -2,118 +2,15 @@ import json
 import tkinter as tk
 from tkinter import ttk, messagebox
 import re
-from deepdiff import DeepDiff
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import PatternFill, Alignment
 import os
 from collections import OrderedDict
-
-# ----------------- JSON Utility -----------------
-def remove_description(obj):
-    if isinstance(obj, dict):
-        obj.pop("description", None)
-        for v in obj.values():
-            remove_description(v)
-    elif isinstance(obj, list):
-        for item in obj:
-            remove_description(item)
-
-def filter_out_debug(obj):
-    if isinstance(obj, dict):
-        return {k: filter_out_debug(v) for k, v in obj.items() if "debug" not in k.lower()}
-    elif isinstance(obj, list):
-        return [filter_out_debug(i) for i in obj]
-    else:
-        return obj
-
-def build_partial_json(base, diff_paths):
-    partial = {}
-    for path in diff_paths:
-        keys = re.findall(r"\['([^]]+)'\]|\[(\d+)\]", path)
-        keys = [k[0] if k[0] else int(k[1]) for k in keys]
-        current_src = base
-        current_partial = partial
-        parents = [] # To keep track of parent objects/lists for updating references
-        for i, key in enumerate(keys):
-            is_last = (i == len(keys) - 1)
-            
-            # Navigate current_src
-            if isinstance(current_src, dict):
-                if key not in current_src:
-                    break # Path not found in source
-            elif isinstance(current_src, list):
-                if not isinstance(key, int) or key >= len(current_src):
-                    break # Path not found in source or invalid index
-            else:
-                break # Not a dict or list, cannot navigate further
-
-            if isinstance(key, int): # Handling list items
-                if not isinstance(current_partial, list):
-                    if isinstance(current_partial, dict) and not current_partial:
-                        new_list = []
-                        if parents: # Update parent reference
-                            parent, parent_key = parents[-1]
-                            if isinstance(parent, dict):
-                                parent[parent_key] = new_list
-                            elif isinstance(parent, list):
-                                parent[parent_key] = new_list
-                        else: # This is the root level
-                            partial = new_list
-                        current_partial = new_list
-                    else: # current_partial is not a list and not an empty dict, so cannot proceed
-                        break
-                
-                # Ensure list is long enough for the index
-                while len(current_partial) <= key:
-                    current_partial.append({}) # Fill with empty dicts or appropriate default
-                
-                if is_last:
-                    current_partial[key] = current_src[key]
-                else:
-                    parents.append((current_partial, key))
-                    current_partial = current_partial[key]
-                    current_src = current_src[key]
-
-            else: # Handling dictionary keys (string key)
-                if not isinstance(current_partial, dict):
-                    break # Not a dict, cannot add string key
-                
-                if key not in current_partial:
-                    current_partial[key] = {} # Create empty dict for nested structure
-                
-                if is_last:
-                    current_partial[key] = current_src[key]
-                else:
-                    parents.append((current_partial, key))
-                    current_partial = current_partial[key]
-                    current_src = current_src[key]
-    return partial
-
-def format_full_output(data):
-    if not isinstance(data, dict):
-        return json.dumps(data, indent=2, ensure_ascii=False)
-    output_lines = []
-    
-    # Process promoInfo first if it exists
-    if "promoInfo" in data and isinstance(data["promoInfo"], list):
-        sorted_promos = sorted(
-            data["promoInfo"],
-            key=lambda p: int(p.get("promoNumber", "0")) if str(p.get("promoNumber", "0")).isdigit() else float('inf')
-        )
-        for promo in sorted_promos:
-            promo_number = promo.get("promoNumber", "N/A")
-            output_lines.append(f"promoNumber: {promo_number}")
-            output_lines.append(json.dumps(promo, indent=2, ensure_ascii=False))
-            output_lines.append("")
-    
-    other_keys = [k for k in data.keys() if k != "promoInfo"]
-
-    for key in other_keys:
-        value = data[key]
-        output_lines.append(f'"{key}": {json.dumps(value, indent=2, ensure_ascii=False)}')
-        output_lines.append("")
-    
-    return "\n".join(output_lines).strip()
+from datetime import datetime
+from compare_engine import (
+    format_full_output, prepare_compare_data, compute_diff_results, iter_aligned_lines,
+    pair_promos, to_pretty_json_text, write_diff_jsonl, build_case, export_cases_to_excel,
+)
 
 # ----------------- GUI Utility -----------------
 def clear_label_result():
@@ -213,18 +110,6 @@ last_export_data = None
 
 # ----------------- Excel Export Utility -----------------
 
-def filter_out_debug(data):
-    if isinstance(data, dict):
-        keys_to_remove = ["debug", "qualifySpend", "quantity", "numberOfTotalSavers"]
-        for key in keys_to_remove:
-            data.pop(key, None)
-        for v in data.values():
-            filter_out_debug(v)
-    elif isinstance(data, list):
-        for item in data:
-            filter_out_debug(item)
-    return data
-
 def to_pretty_json_blocks(promo_list):
     blocks = []
     for promo in promo_list:
@@ -246,19 +131,6 @@ def to_pretty_json_blocks(promo_list):
         blocks.append(f"{header}\n{pretty_json}")
     return blocks
 
-
-def filter_out_debug(data):
-    if isinstance(data, dict):
-        keys_to_remove = ["debug", "qualifySpend", "quantity", "numberOfTotalSavers"]
-        for key in keys_to_remove:
-            data.pop(key, None)
-        for v in data.values():
-            filter_out_debug(v)
-    elif isinstance(data, list):
-        for item in data:
-            filter_out_debug(item)
-    return data
-
 def to_pretty_json_blocks(promo_list):
     blocks = []
     for promo in promo_list:
@@ -283,61 +155,7 @@ def to_pretty_json_blocks(promo_list):
 
 def write_lines_aligned_to_excel(ws, start_row, base_lines, compare_lines, diff_fill, align_top_wrap):
     row = start_row
-    len_b, len_c = len(base_lines), len(compare_lines)
-    i, j = 0, 0
-
-    def extract_key(line):
-        stripped = line.lstrip()
-        if ":" in stripped:
-            return stripped.split(":", 1)[0].strip().strip('"')
-        return None
-
-    while i < len_b or j < len_c:
-        b_line = base_lines[i] if i < len_b else None
-        c_line = compare_lines[j] if j < len_c else None
-
-        b_key = extract_key(b_line) if b_line else None
-        c_key = extract_key(c_line) if c_line else None
-
-        if b_key == c_key:
-            val_b = b_line or ""
-            val_c = c_line or ""
-            i += 1
-            j += 1
-        elif c_key and (b_key != c_key):
-            found_idx = None
-            for k in range(i + 1, len_b):
-                if extract_key(base_lines[k]) == c_key:
-                    found_idx = k
-                    break
-            if found_idx is not None:
-                val_b = b_line or ""
-                val_c = ""
-                i += 1
-            else:
-                val_b = ""
-                val_c = c_line or ""
-                j += 1
-        elif b_key and (c_key != b_key):
-            found_idx = None
-            for k in range(j + 1, len_c):
-                if extract_key(compare_lines[k]) == b_key:
-                    found_idx = k
-                    break
-            if found_idx is not None:
-                val_b = ""
-                val_c = c_line or ""
-                j += 1
-            else:
-                val_b = b_line or ""
-                val_c = ""
-                i += 1
-        else:
-            val_b = b_line or ""
-            val_c = c_line or ""
-            i += (i < len_b)
-            j += (j < len_c)
-
+    for val_b, val_c in iter_aligned_lines(base_lines, compare_lines):
         cell_b = ws.cell(row=row, column=3, value=val_b)
         cell_c = ws.cell(row=row, column=2, value=val_c)
         cell_b.alignment = align_top_wrap
@@ -353,57 +171,6 @@ def write_lines_aligned_to_excel(ws, start_row, base_lines, compare_lines, diff_
     return row
 
 
-def split_promos(lines):
-    promos = []
-    current_block = []
-    for line in lines:
-        if line.strip().startswith("promoNumber:"):
-            if current_block:
-                promos.append(current_block)
-            current_block = [line]
-        else:
-            current_block.append(line)
-    if current_block:
-        promos.append(current_block)
-    return promos
-
-
-def extract_promo_number(block):
-    for line in block:
-        line = line.strip()
-        if line.startswith("promoNumber:"):
-            return line.split(":", 1)[1].strip()
-    return None
-
-
-def try_parse_int(val):
-    try:
-        return int(val)
-    except:
-        return val  # fallback
-
-
-def pair_promos(base_lines, compare_lines):
-    base_blocks = split_promos(base_lines)
-    compare_blocks = split_promos(compare_lines)
-
-    base_dict = {extract_promo_number(b): b for b in base_blocks}
-    compare_dict = {extract_promo_number(c): c for c in compare_blocks}
-
-    # ✅ แก้ตรงนี้ให้ sort promoNumber ตามลำดับตัวเลข (หากเป็นเลข)
-    all_promos = sorted(
-        set(base_dict.keys()) | set(compare_dict.keys()),
-        key=lambda x: (x is None, try_parse_int(x))
-    )
-
-    paired_blocks = []
-    for promo in all_promos:
-        b_block = base_dict.get(promo, [])
-        c_block = compare_dict.get(promo, [])
-        paired_blocks.append((b_block, c_block))
-    return paired_blocks
-
-
 def write_promos_to_excel(ws, start_row, base_lines, compare_lines, diff_fill, align_top_wrap):
     paired_blocks = pair_promos(base_lines, compare_lines)
     row = start_row
@@ -454,17 +221,8 @@ def export_to_excel():
         raw_newpro = text_base.get("1.0", tk.END).strip()
         raw_online = text_compare.get("1.0", tk.END).strip()
 
-        try:
-            newpro_obj = json.loads(raw_newpro) if raw_newpro else {}
-            res_newpro_text = json.dumps(newpro_obj, ensure_ascii=False, indent=2)
-        except Exception:
-            res_newpro_text = raw_newpro
-
-        try:
-            online_obj = json.loads(raw_online) if raw_online else {}
-            res_online_text = json.dumps(online_obj, ensure_ascii=False, indent=2)
-        except Exception:
-            res_online_text = raw_online
+        res_newpro_text = to_pretty_json_text(raw_newpro)
+        res_online_text = to_pretty_json_text(raw_online)
 
     except Exception as e:
         messagebox.showerror("Input Error", f"Unable to read inputs: {e}")
@@ -501,102 +259,120 @@ def export_to_excel():
         messagebox.showerror("Save Failed", f"An unexpected error occurred:\n{e}")
 
 
+# ----------------- JSONL Export Utility -----------------
 
-# ----------------- Core Function: compare_json ----------------- #===================อย่าแก้ไขส่วนนี้ลงไป===================
-
-
-def compare_json():
+def export_to_jsonl():
     try:
-        base_data = json.loads(text_base.get("1.0", tk.END))
-        compare_data = json.loads(text_compare.get("1.0", tk.END))
+        raw_newpro = text_base.get("1.0", tk.END).strip()
+        raw_online = text_compare.get("1.0", tk.END).strip()
+        base_data = prepare_compare_data(json.loads(raw_newpro))
+        compare_data = prepare_compare_data(json.loads(raw_online))
     except json.JSONDecodeError as e:
         messagebox.showerror("รูปแบบ JSON ไม่ถูกต้อง", str(e))
         return
 
-    remove_description(base_data)
-    remove_description(compare_data)
+    if not isinstance(base_data, dict) or not isinstance(compare_data, dict):
+        messagebox.showerror("รูปแบบ JSON ไม่ถูกต้อง", "LP และ Pro Engine ต้องเป็น JSON object")
+        return
 
-    base_filtered = filter_out_debug(base_data)
-    compare_filtered = filter_out_debug(compare_data)
+    filename = filename_entry.get().strip()
+    if not filename:
+        filename = "Compare_Export"
+    run_id = datetime.now().isoformat(timespec="seconds")
+    jsonl_path = os.path.join(EXPORT_FOLDER, f"{filename}.jsonl")
 
-    base_promos = {p["promoNumber"]: p for p in base_filtered.get("promoInfo", []) if "promoNumber" in p}
-    compare_promos = {p["promoNumber"]: p for p in compare_filtered.get("promoInfo", []) if "promoNumber" in p}
+    # เปิดแบบ append เพื่อให้หลายเคสใน batch รวมอยู่ในไฟล์เดียวกันได้
+    # แต่ละ record มี "run" (เวลาที่ export) ไว้แยกการ export ซ้ำของเคสเดิม
+    try:
+        with open(jsonl_path, "a", encoding="utf-8") as fp:
+            count = write_diff_jsonl(fp, base_data, compare_data, case_name=filename, run_id=run_id)
+    except Exception as e:
+        messagebox.showerror("Save Failed", f"An unexpected error occurred:\n{e}")
+        return
 
-    partial_base_result = {"promoInfo": []}
-    partial_compare_result = {"promoInfo": []}
-    total_diff_paths = []
+    messagebox.showinfo("Export Successful", f"{count} diff record(s) saved to:\n{jsonl_path}")
 
-    all_promo_numbers = sorted(set(base_promos.keys()) | set(compare_promos.keys()), key=lambda x: int(x))
 
-    for promo_num in all_promo_numbers:
-        base_promo = base_promos.get(promo_num)
-        compare_promo = compare_promos.get(promo_num)
+# ----------------- Multi-case Excel Export Utility -----------------
 
-        if base_promo and compare_promo:
-            # กรณีมีทั้งสองฝั่ง
-            diff = DeepDiff(base_promo, compare_promo, ignore_order=False, report_repetition=True, view="tree")
+# เคสที่รอ export รวมเป็น workbook เดียว
+batch_cases = []
 
-            if not diff:
-                continue  # ไม่มี diff ก็ไม่ต้องใส่
 
-            path_list = []
-            for section in diff:
-                for change in diff[section]:
-                    if hasattr(change, 'path'):
-                        path = change.path(output_format='list')
-                        s = "".join(f"[{p}]" if isinstance(p, int) else f"['{p}']" for p in path)
-                        path_list.append(s)
+def add_case_to_batch():
+    name = filename_entry.get().strip() or f"Case {len(batch_cases) + 1}"
+    try:
+        case = build_case(
+            name,
+            text_request.get("1.0", tk.END).strip(),
+            text_base.get("1.0", tk.END).strip(),
+            text_compare.get("1.0", tk.END).strip(),
+        )
+    except ValueError as e:  # รวม json.JSONDecodeError
+        messagebox.showerror("รูปแบบ JSON ไม่ถูกต้อง", str(e))
+        return
 
-            total_diff_paths.extend([f"['promoInfo'][{len(partial_base_result['promoInfo'])}]{p}" for p in path_list])
+    batch_cases.append(case)
+    label_result.config(text=f"➕ เพิ่ม {name} แล้ว ({len(batch_cases)} เคสใน batch)", foreground="#66ff99")
 
-            partial_base = build_partial_json(base_promo, path_list)
-            partial_base["promoNumber"] = promo_num
-            partial_compare = build_partial_json(compare_promo, path_list)
-            partial_compare["promoNumber"] = promo_num
 
-        elif base_promo and not compare_promo:
-            # มีเฉพาะใน Base
-            partial_base = base_promo.copy()
-            partial_base["promoNumber"] = promo_num
-            partial_compare = {"promoNumber": promo_num}  # ว่างเปล่า
+def export_batch_to_excel():
+    if not batch_cases:
+        messagebox.showwarning("No Batch Data", "Please add at least one case to the batch before exporting.")
+        return
+
+    # ใช้ชื่อไฟล์ลงท้าย _batch เสมอ เพื่อไม่ให้ทับไฟล์ของ export_to_excel ที่ชื่อเดียวกับเคส
+    filename = filename_entry.get().strip()
+    if not filename:
+        filename = "Batch_Export"
+    excel_path = os.path.join(EXPORT_FOLDER, f"{filename}_batch.xlsx")
+    jsonl_path = os.path.join(EXPORT_FOLDER, f"{filename}_batch.jsonl")
 
-        elif compare_promo and not base_promo:
-            # มีเฉพาะใน Compare
-            partial_compare = compare_promo.copy()
-            partial_compare["promoNumber"] = promo_num
-            partial_base = {"promoNumber": promo_num}  # ว่างเปล่า
+    if os.path.exists(excel_path) and not messagebox.askyesno(
+        "File Exists", f"{excel_path}\nalready exists. Overwrite it?"
+    ):
+        return
 
-        partial_base_result["promoInfo"].append(partial_base)
-        partial_compare_result["promoInfo"].append(partial_compare)
+    # JSONL ของ batch เขียนคู่กับ workbook (ทับไฟล์เดิมเหมือนกัน) โดยแยกเคสด้วย "case"
+    run_id = datetime.now().isoformat(timespec="seconds")
+    try:
+        export_cases_to_excel(batch_cases, excel_path)
+        with open(jsonl_path, "w", encoding="utf-8") as fp:
+            count = sum(
+                write_diff_jsonl(fp, case["base_data"], case["compare_data"],
+                                 case_name=case["name"], run_id=run_id)
+                for case in batch_cases
+            )
+    except PermissionError:
+        messagebox.showerror("Save Failed", "Permission denied. Please close the Excel file and try again.")
+        return
+    except Exception as e:
+        messagebox.showerror("Save Failed", f"An unexpected error occurred:\n{e}")
+        return
 
-    # ==== เปรียบเทียบฟิลด์อื่น ๆ ที่ไม่ใช่ promoInfo ====
-    other_keys = set(base_filtered.keys()) | set(compare_filtered.keys())
-    other_keys.discard("promoInfo")
+    messagebox.showinfo(
+        "Export Successful",
+        f"{len(batch_cases)} case(s) saved to:\n{excel_path}\n\n{count} diff record(s) saved to:\n{jsonl_path}",
+    )
+    batch_cases.clear()
 
-    for key in sorted(other_keys):
-        if key not in base_filtered or key not in compare_filtered:
-            continue
 
-        diff = DeepDiff(base_filtered[key], compare_filtered[key], ignore_order=False, report_repetition=True, view="tree")
 
-        if not diff:
-            continue
+# ----------------- Core Function: compare_json ----------------- #===================อย่าแก้ไขส่วนนี้ลงไป===================
 
-        path_list = []
-        for section in diff:
-            for change in diff[section]:
-                if hasattr(change, 'path'):
-                    path = change.path(output_format='list')
-                    s = f"['{key}']" + "".join(f"[{p}]" if isinstance(p, int) else f"['{p}']" for p in path)
-                    path_list.append(s)
 
-        total_diff_paths.extend(path_list)
+def compare_json():
+    try:
+        base_data = json.loads(text_base.get("1.0", tk.END))
+        compare_data = json.loads(text_compare.get("1.0", tk.END))
+    except json.JSONDecodeError as e:
+        messagebox.showerror("รูปแบบ JSON ไม่ถูกต้อง", str(e))
+        return
 
-        partial_base = build_partial_json(base_filtered, path_list)
-        partial_compare = build_partial_json(compare_filtered, path_list)
+    base_filtered = prepare_compare_data(base_data)
+    compare_filtered = prepare_compare_data(compare_data)
 
-        partial_base_result.update(partial_base)
-        partial_compare_result.update(partial_compare)
+    partial_base_result, partial_compare_result, total_diff_paths = compute_diff_results(base_filtered, compare_filtered)
 
     # ==== สร้างผลลัพธ์และแสดงผล ====
     base_result = format_full_output(partial_base_result)
@@ -717,6 +493,9 @@ frame_controls = ttk.Frame(root)
 frame_controls.grid(row=4, column=1, pady=5)
 ttk.Button(frame_controls, text="📋 Copy Pro Engine Diff", command=lambda: copy_text(text_partial_base)).pack(side="left", padx=15)
 ttk.Button(frame_controls, text="📤 Export to Excel", command=export_to_excel).pack(side="left", padx=15)
+ttk.Button(frame_controls, text="🧾 Export JSONL", command=export_to_jsonl).pack(side="left", padx=15)
+ttk.Button(frame_controls, text="➕ Add to Batch", command=add_case_to_batch).pack(side="left", padx=15)
+ttk.Button(frame_controls, text="📚 Export Batch", command=export_batch_to_excel).pack(side="left", padx=15)
 ttk.Button(frame_controls, text="📋 Copy LP Diff", command=lambda: copy_text(text_partial_compare)).pack(side="left", padx=15)
 
 frame_output = ttk.Frame(root)
@@ -0,0 +1,701 @@
+import json
+import re
+from deepdiff import DeepDiff
+from openpyxl import Workbook
+from openpyxl.styles import PatternFill, Alignment, Font
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.worksheet.hyperlink import Hyperlink
+import numpy as np
+
+# ส่วนเปรียบเทียบที่ไม่ต้องใช้ GUI (Text_Ver.py และ compare_service.py ใช้ร่วมกัน)
+# ห้าม import tkinter ในไฟล์นี้ เพื่อให้รันบนเครื่องที่ไม่มี display ได้
+
+# ----------------- JSON Utility -----------------
+def remove_description(obj):
+    if isinstance(obj, dict):
+        obj.pop("description", None)
+        for v in obj.values():
+            remove_description(v)
+    elif isinstance(obj, list):
+        for item in obj:
+            remove_description(item)
+
+def filter_out_debug(data):
+    if isinstance(data, dict):
+        keys_to_remove = ["debug", "qualifySpend", "quantity", "numberOfTotalSavers"]
+        for key in keys_to_remove:
+            data.pop(key, None)
+        for v in data.values():
+            filter_out_debug(v)
+    elif isinstance(data, list):
+        for item in data:
+            filter_out_debug(item)
+    return data
+
+def build_partial_json(base, diff_paths):
+    partial = {}
+    for path in diff_paths:
+        keys = re.findall(r"\['([^]]+)'\]|\[(\d+)\]", path)
+        keys = [k[0] if k[0] else int(k[1]) for k in keys]
+        current_src = base
+        current_partial = partial
+        parents = [] # To keep track of parent objects/lists for updating references
+        for i, key in enumerate(keys):
+            is_last = (i == len(keys) - 1)
+            
+            # Navigate current_src
+            if isinstance(current_src, dict):
+                if key not in current_src:
+                    break # Path not found in source
+            elif isinstance(current_src, list):
+                if not isinstance(key, int) or key >= len(current_src):
+                    break # Path not found in source or invalid index
+            else:
+                break # Not a dict or list, cannot navigate further
+
+            if isinstance(key, int): # Handling list items
+                if not isinstance(current_partial, list):
+                    if isinstance(current_partial, dict) and not current_partial:
+                        new_list = []
+                        if parents: # Update parent reference
+                            parent, parent_key = parents[-1]
+                            if isinstance(parent, dict):
+                                parent[parent_key] = new_list
+                            elif isinstance(parent, list):
+                                parent[parent_key] = new_list
+                        else: # This is the root level
+                            partial = new_list
+                        current_partial = new_list
+                    else: # current_partial is not a list and not an empty dict, so cannot proceed
+                        break
+                
+                # Ensure list is long enough for the index
+                while len(current_partial) <= key:
+                    current_partial.append({}) # Fill with empty dicts or appropriate default
+                
+                if is_last:
+                    current_partial[key] = current_src[key]
+                else:
+                    parents.append((current_partial, key))
+                    current_partial = current_partial[key]
+                    current_src = current_src[key]
+
+            else: # Handling dictionary keys (string key)
+                if not isinstance(current_partial, dict):
+                    break # Not a dict, cannot add string key
+                
+                if key not in current_partial:
+                    current_partial[key] = {} # Create empty dict for nested structure
+                
+                if is_last:
+                    current_partial[key] = current_src[key]
+                else:
+                    parents.append((current_partial, key))
+                    current_partial = current_partial[key]
+                    current_src = current_src[key]
+    return partial
+
+def format_full_output(data):
+    if not isinstance(data, dict):
+        return json.dumps(data, indent=2, ensure_ascii=False)
+    output_lines = []
+    
+    # Process promoInfo first if it exists
+    if "promoInfo" in data and isinstance(data["promoInfo"], list):
+        sorted_promos = sorted(
+            data["promoInfo"],
+            key=lambda p: int(p.get("promoNumber", "0")) if str(p.get("promoNumber", "0")).isdigit() else float('inf')
+        )
+        for promo in sorted_promos:
+            promo_number = promo.get("promoNumber", "N/A")
+            output_lines.append(f"promoNumber: {promo_number}")
+            output_lines.append(json.dumps(promo, indent=2, ensure_ascii=False))
+            output_lines.append("")
+    
+    other_keys = [k for k in data.keys() if k != "promoInfo"]
+
+    for key in other_keys:
+        value = data[key]
+        output_lines.append(f'"{key}": {json.dumps(value, indent=2, ensure_ascii=False)}')
+        output_lines.append("")
+    
+    return "\n".join(output_lines).strip()
+
+def prepare_compare_data(data):
+    remove_description(data)
+    return filter_out_debug(data)
+
+def promo_sort_key(promo_num):
+    text = str(promo_num)
+    return (not text.isdigit(), int(text) if text.isdigit() else text)
+
+# ----------------- Numeric Tolerance Utility -----------------
+# กฎเปรียบเทียบตัวเลขราย field (ใช้ชื่อ key สุดท้ายของ path)
+#   abs    = ค่าความต่างสัมบูรณ์ที่ยอมรับได้
+#   rel    = ค่าความต่างสัมพัทธ์ที่ยอมรับได้ (เทียบกับค่าที่มากกว่า)
+#   coerce = แปลง string ที่เป็นตัวเลขก่อนเทียบ และยอมให้ชนิดต่างกันได้
+#            เช่น "2500" กับ 2500, "1" กับ "1.000000" หรือ 1 กับ 1.0
+# field ที่ไม่ได้ระบุจะใช้กฎ "*" (ค่าเริ่มต้น = ต้องเท่ากันทุกประการ ไม่แปลงชนิด)
+FIELD_RULES = {
+    "*": {"abs": 0, "rel": 0.0, "coerce": False},
+    # LP กับ Pro Engine ส่ง field เหล่านี้เป็น string / ตัวเลขคนละแบบกัน
+    "rewardAmount": {"coerce": True},
+    "endingBalance": {"coerce": True},
+}
+
+INT_TEXT = re.compile(r"[+-]?\d+")
+FLOAT_TEXT = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?")
+
+def get_field_rule(field):
+    rule = dict(FIELD_RULES.get("*", {}))
+    rule.update(FIELD_RULES.get(field, {}))
+    return rule
+
+def to_number(value, coerce):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if coerce and isinstance(value, str):
+        text = value.strip()
+        if INT_TEXT.fullmatch(text):
+            return int(text)
+        if FLOAT_TEXT.fullmatch(text):
+            return float(text)
+    return None
+
+def last_field_name(keys):
+    for key in reversed(list(keys)):
+        if isinstance(key, str) and not key.isdigit():
+            return key
+    return None
+
+def tolerated_mask(pairs):
+    """
+    pairs = [(field, ค่าฝั่ง LP, ค่าฝั่ง Pro Engine), ...]
+    คืนค่า list[bool] ว่าคู่ไหนถือว่าเท่ากันตามกฎใน FIELD_RULES
+    คู่ int/int เทียบแบบตรงตัว (ไม่แปลงเป็น float) ส่วนคู่ที่มี float
+    คำนวณพร้อมกันด้วย NumPy ในรอบเดียว
+    """
+    mask = [False] * len(pairs)
+    index, left, right, abs_tol, rel_tol = [], [], [], [], []
+    for i, (field, a, b) in enumerate(pairs):
+        rule = get_field_rule(field)
+        coerce = rule.get("coerce", False)
+        if not coerce and type(a) is not type(b):
+            continue
+        num_a = to_number(a, coerce)
+        num_b = to_number(b, coerce)
+        if num_a is None or num_b is None:
+            continue
+
+        if isinstance(num_a, int) and isinstance(num_b, int):
+            limit = max(rule.get("abs", 0), rule.get("rel", 0.0) * max(abs(num_a), abs(num_b)))
+            mask[i] = abs(num_a - num_b) <= limit
+            continue
+
+        index.append(i)
+        left.append(num_a)
+        right.append(num_b)
+        abs_tol.append(rule.get("abs", 0))
+        rel_tol.append(rule.get("rel", 0.0))
+
+    if not index:
+        return mask
+
+    left = np.asarray(left, dtype=float)
+    right = np.asarray(right, dtype=float)
+    limit = np.maximum(np.asarray(abs_tol, dtype=float),
+                       np.asarray(rel_tol, dtype=float) * np.maximum(np.abs(left), np.abs(right)))
+    within = np.abs(left - right) <= limit
+    for i, ok in zip(index, within.tolist()):
+        mask[i] = ok
+    return mask
+
+# ----------------- Line Alignment Utility -----------------
+
+def iter_aligned_lines(base_lines, compare_lines):
+    len_b, len_c = len(base_lines), len(compare_lines)
+    i, j = 0, 0
+
+    def extract_key(line):
+        stripped = line.lstrip()
+        if ":" in stripped:
+            return stripped.split(":", 1)[0].strip().strip('"')
+        return None
+
+    while i < len_b or j < len_c:
+        b_line = base_lines[i] if i < len_b else None
+        c_line = compare_lines[j] if j < len_c else None
+
+        b_key = extract_key(b_line) if b_line else None
+        c_key = extract_key(c_line) if c_line else None
+
+        if b_key == c_key:
+            val_b = b_line or ""
+            val_c = c_line or ""
+            i += 1
+            j += 1
+        elif c_key and (b_key != c_key):
+            found_idx = None
+            for k in range(i + 1, len_b):
+                if extract_key(base_lines[k]) == c_key:
+                    found_idx = k
+                    break
+            if found_idx is not None:
+                val_b = b_line or ""
+                val_c = ""
+                i += 1
+            else:
+                val_b = ""
+                val_c = c_line or ""
+                j += 1
+        elif b_key and (c_key != b_key):
+            found_idx = None
+            for k in range(j + 1, len_c):
+                if extract_key(compare_lines[k]) == b_key:
+                    found_idx = k
+                    break
+            if found_idx is not None:
+                val_b = ""
+                val_c = c_line or ""
+                j += 1
+            else:
+                val_b = b_line or ""
+                val_c = ""
+                i += 1
+        else:
+            val_b = b_line or ""
+            val_c = c_line or ""
+            i += (i < len_b)
+            j += (j < len_c)
+
+        yield val_b, val_c
+
+
+def split_promos(lines):
+    promos = []
+    current_block = []
+    for line in lines:
+        if line.strip().startswith("promoNumber:"):
+            if current_block:
+                promos.append(current_block)
+            current_block = [line]
+        else:
+            current_block.append(line)
+    if current_block:
+        promos.append(current_block)
+    return promos
+
+
+def extract_promo_number(block):
+    for line in block:
+        line = line.strip()
+        if line.startswith("promoNumber:"):
+            return line.split(":", 1)[1].strip()
+    return None
+
+
+def try_parse_int(val):
+    try:
+        return int(val)
+    except:
+        return val  # fallback
+
+
+def pair_promos(base_lines, compare_lines):
+    base_blocks = split_promos(base_lines)
+    compare_blocks = split_promos(compare_lines)
+
+    base_dict = {extract_promo_number(b): b for b in base_blocks}
+    compare_dict = {extract_promo_number(c): c for c in compare_blocks}
+
+    # ✅ แก้ตรงนี้ให้ sort promoNumber ตามลำดับตัวเลข (หากเป็นเลข)
+    all_promos = sorted(
+        set(base_dict.keys()) | set(compare_dict.keys()),
+        key=lambda x: (x is None, promo_sort_key(x))
+    )
+
+    paired_blocks = []
+    for promo in all_promos:
+        b_block = base_dict.get(promo, [])
+        c_block = compare_dict.get(promo, [])
+        paired_blocks.append((b_block, c_block))
+    return paired_blocks
+
+
+def to_pretty_json_text(raw):
+    try:
+        obj = json.loads(raw) if raw else {}
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+    except Exception:
+        return raw
+
+
+# ----------------- Diff Core -----------------
+
+def diff_path_to_str(keys):
+    return "".join(f"[{p}]" if isinstance(p, int) else f"['{p}']" for p in keys)
+
+
+def collect_changes(diff, prefix=()):
+    changes = []
+    for section in diff:
+        for change in diff[section]:
+            if hasattr(change, 'path'):
+                changes.append((list(prefix) + change.path(output_format='list'), change.t1, change.t2))
+    return changes
+
+
+def compute_diff_results(base_filtered, compare_filtered):
+    """
+    คืนค่า (partial_base_result, partial_compare_result, total_diff_paths)
+    diff ตัวเลขที่อยู่ในเกณฑ์ของ FIELD_RULES จะถูกตัดออกก่อนสร้าง partial JSON
+    """
+    base_promos = {p["promoNumber"]: p for p in base_filtered.get("promoInfo", []) if "promoNumber" in p}
+    compare_promos = {p["promoNumber"]: p for p in compare_filtered.get("promoInfo", []) if "promoNumber" in p}
+
+    # ==== รอบที่ 1: เก็บ diff ทั้งหมดก่อน ====
+    promo_groups = []
+    all_promo_numbers = sorted(set(base_promos.keys()) | set(compare_promos.keys()), key=promo_sort_key)
+
+    for promo_num in all_promo_numbers:
+        base_promo = base_promos.get(promo_num)
+        compare_promo = compare_promos.get(promo_num)
+
+        changes = None
+        if base_promo and compare_promo:
+            diff = DeepDiff(base_promo, compare_promo, ignore_order=False, report_repetition=True, view="tree")
+            if not diff:
+                continue  # ไม่มี diff ก็ไม่ต้องใส่
+            changes = collect_changes(diff)
+        promo_groups.append((promo_num, base_promo, compare_promo, changes))
+
+    other_groups = []
+    other_keys = set(base_filtered.keys()) | set(compare_filtered.keys())
+    other_keys.discard("promoInfo")
+
+    for key in sorted(other_keys):
+        if key not in base_filtered or key not in compare_filtered:
+            continue
+        diff = DeepDiff(base_filtered[key], compare_filtered[key], ignore_order=False, report_repetition=True, view="tree")
+        if not diff:
+            continue
+        other_groups.append(collect_changes(diff, (key,)))
+
+    # ==== รอบที่ 2: ตรวจ tolerance ของตัวเลขทุกคู่ในครั้งเดียว ====
+    all_changes = [c for group in promo_groups if group[3] for c in group[3]]
+    all_changes += [c for changes in other_groups for c in changes]
+    mask = iter(tolerated_mask([(last_field_name(keys), t1, t2) for keys, t1, t2 in all_changes]))
+
+    def remaining(changes):
+        return [keys for (keys, _, _), ok in zip(changes, mask) if not ok]
+
+    # ==== รอบที่ 3: สร้าง partial JSON จาก diff ที่เหลือ ====
+    partial_base_result = {"promoInfo": []}
+    partial_compare_result = {"promoInfo": []}
+    total_diff_paths = []
+
+    for promo_num, base_promo, compare_promo, changes in promo_groups:
+        if changes is not None:
+            # กรณีมีทั้งสองฝั่ง
+            path_list = [diff_path_to_str(keys) for keys in remaining(changes)]
+            if not path_list:
+                continue
+
+            total_diff_paths.extend([f"['promoInfo'][{len(partial_base_result['promoInfo'])}]{p}" for p in path_list])
+
+            partial_base = build_partial_json(base_promo, path_list)
+            partial_base["promoNumber"] = promo_num
+            partial_compare = build_partial_json(compare_promo, path_list)
+            partial_compare["promoNumber"] = promo_num
+
+        elif base_promo and not compare_promo:
+            # มีเฉพาะใน Base
+            partial_base = base_promo.copy()
+            partial_base["promoNumber"] = promo_num
+            partial_compare = {"promoNumber": promo_num}  # ว่างเปล่า
+
+        else:
+            # มีเฉพาะใน Compare
+            partial_compare = compare_promo.copy()
+            partial_compare["promoNumber"] = promo_num
+            partial_base = {"promoNumber": promo_num}  # ว่างเปล่า
+
+        partial_base_result["promoInfo"].append(partial_base)
+        partial_compare_result["promoInfo"].append(partial_compare)
+
+    # ==== เปรียบเทียบฟิลด์อื่น ๆ ที่ไม่ใช่ promoInfo ====
+    for changes in other_groups:
+        path_list = [diff_path_to_str(keys) for keys in remaining(changes)]
+        if not path_list:
+            continue
+
+        total_diff_paths.extend(path_list)
+
+        partial_base = build_partial_json(base_filtered, path_list)
+        partial_compare = build_partial_json(compare_filtered, path_list)
+
+        partial_base_result.update(partial_base)
+        partial_compare_result.update(partial_compare)
+
+    return partial_base_result, partial_compare_result, total_diff_paths
+
+
+# ----------------- JSON Patch / JSONL Utility -----------------
+
+def json_pointer(keys):
+    # RFC 6901: "~" -> "~0", "/" -> "~1"
+    return "".join("/" + str(k).replace("~", "~0").replace("/", "~1") for k in keys)
+
+
+def build_json_patch(base, compare, keys=()):
+    """สร้าง RFC 6902 JSON Patch ที่แปลง base ให้เป็น compare"""
+    if isinstance(base, dict) and isinstance(compare, dict):
+        ops = []
+        for k in base:
+            if k not in compare:
+                ops.append({"op": "remove", "path": json_pointer(keys + (k,))})
+        for k, v in compare.items():
+            if k not in base:
+                ops.append({"op": "add", "path": json_pointer(keys + (k,)), "value": v})
+            else:
+                ops.extend(build_json_patch(base[k], v, keys + (k,)))
+        return ops
+
+    if isinstance(base, list) and isinstance(compare, list):
+        ops = []
+        common = min(len(base), len(compare))
+        for i in range(common):
+            ops.extend(build_json_patch(base[i], compare[i], keys + (i,)))
+        # ลบจาก index ท้ายสุดก่อน เพื่อให้ index ที่เหลือยังถูกต้องตอน apply
+        for i in range(len(base) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": json_pointer(keys + (i,))})
+        for v in compare[common:]:
+            ops.append({"op": "add", "path": json_pointer(keys + ("-",)), "value": v})
+        return ops
+
+    if type(base) is not type(compare) or base != compare:
+        return [{"op": "replace", "path": json_pointer(keys), "value": compare}]
+    return []
+
+
+def pointer_keys(path):
+    return [p.replace("~1", "/").replace("~0", "~") for p in path.split("/")[1:]]
+
+
+def get_by_keys(doc, keys):
+    for key in keys:
+        doc = doc[int(key)] if isinstance(doc, list) else doc[key]
+    return doc
+
+
+def find_tolerated_ops(base, ops):
+    """
+    คืนค่า op "replace" ที่ค่าตัวเลขต่างกันไม่เกินกฎใน FIELD_RULES
+    (patch เดิมไม่ถูกแก้ เพื่อให้ยังแปลง LP เป็น Pro Engine ได้ครบ)
+    """
+    replace_ops = [op for op in ops if op["op"] == "replace"]
+    pairs = []
+    for op in replace_ops:
+        keys = pointer_keys(op["path"])
+        pairs.append((last_field_name(keys), get_by_keys(base, keys), op["value"]))
+    return [op for op, ok in zip(replace_ops, tolerated_mask(pairs)) if ok]
+
+
+def iter_diff_records(base_data, compare_data):
+    """
+    คืนค่า record ทีละ promo (และทีละ field นอก promoInfo) ที่มีความแตกต่าง
+    แต่ละ record มี "root" (JSON Pointer ในเอกสาร LP) และ "patch" เป็น JSON Patch
+    ที่ใช้กับค่าที่ root นั้น เพื่อแปลงฝั่ง LP ให้เป็นฝั่ง Pro Engine
+      - promo ที่ต่างกัน: root = "/promoInfo/<index ใน LP>"
+      - promo ที่เพิ่ม/หายไป: root = "/promoInfo" และ op add "/-" หรือ remove "/<index>"
+      - field อื่น: root = "" (path เต็มจากราก) รวมถึง field ที่มีอยู่ฝั่งเดียว
+    op ใน patch ที่ต่างกันอยู่ในเกณฑ์ FIELD_RULES จะถูกระบุซ้ำไว้ใน "tolerated"
+    (ถ้าทุก op อยู่ในเกณฑ์ ถือว่าไม่มีความแตกต่างจริง)
+    record ของ promo ที่หายไปจะมาท้ายสุดเรียง index จากมากไปน้อย
+    จึง apply ทุก record ตามลำดับกับเอกสาร LP ได้โดย index ไม่เลื่อน
+    (promo จับคู่ด้วย promoNumber ลำดับใน promoInfo จึงอาจไม่ตรงกับฝั่ง Pro Engine)
+    """
+    base_list = base_data.get("promoInfo")
+    compare_list = compare_data.get("promoInfo")
+    has_promos = isinstance(base_list, list) and isinstance(compare_list, list)
+
+    removed = []
+    if has_promos:
+        base_index = {p["promoNumber"]: i for i, p in enumerate(base_list) if isinstance(p, dict) and "promoNumber" in p}
+        compare_promos = {p["promoNumber"]: p for p in compare_list if isinstance(p, dict) and "promoNumber" in p}
+
+        for promo_num in sorted(set(base_index) | set(compare_promos), key=promo_sort_key):
+            compare_promo = compare_promos.get(promo_num)
+            if promo_num not in base_index:
+                yield {"promoNumber": promo_num, "status": "added", "root": "/promoInfo",
+                       "patch": [{"op": "add", "path": "/-", "value": compare_promo}]}
+                continue
+
+            index = base_index[promo_num]
+            if compare_promo is None:
+                removed.append((index, promo_num))
+                continue
+
+            base_promo = base_list[index]
+            patch = build_json_patch(base_promo, compare_promo)
+            if patch:
+                yield {"promoNumber": promo_num, "status": "changed",
+                       "root": json_pointer(("promoInfo", index)), "patch": patch,
+                       "tolerated": find_tolerated_ops(base_promo, patch)}
+
+    other_keys = set(base_data) | set(compare_data)
+    if has_promos:
+        other_keys.discard("promoInfo")
+    for key in sorted(other_keys):
+        if key not in compare_data:
+            yield {"field": key, "status": "removed", "root": "",
+                   "patch": [{"op": "remove", "path": json_pointer((key,))}]}
+        elif key not in base_data:
+            yield {"field": key, "status": "added", "root": "",
+                   "patch": [{"op": "add", "path": json_pointer((key,)), "value": compare_data[key]}]}
+        else:
+            patch = build_json_patch(base_data[key], compare_data[key], (key,))
+            if patch:
+                yield {"field": key, "status": "changed", "root": "", "patch": patch,
+                       "tolerated": find_tolerated_ops(base_data, patch)}
+
+    for index, promo_num in sorted(removed, reverse=True):
+        yield {"promoNumber": promo_num, "status": "removed", "root": "/promoInfo",
+               "patch": [{"op": "remove", "path": json_pointer((index,))}]}
+
+
+def write_diff_jsonl(fp, base_data, compare_data, case_name=None, run_id=None):
+    """
+    เขียน diff record ลง fp ทีละบรรทัด (JSONL) และ flush ทุกบรรทัด
+    เพื่อให้โปรแกรมปลายทางอ่านได้ทันทีโดยไม่ต้องรอให้ทั้ง batch เสร็จ
+    run_id ใช้แยกแต่ละครั้งที่ export เคสเดียวกันซ้ำลงไฟล์เดิม
+    """
+    marker = {}
+    if run_id is not None:
+        marker["run"] = run_id
+    if case_name is not None:
+        marker["case"] = case_name
+
+    count = 0
+    for record in iter_diff_records(base_data, compare_data):
+        record = {**marker, **record}
+        fp.write(json.dumps(record, ensure_ascii=False) + "\n")
+        fp.flush()
+        count += 1
+    return count
+
+
+# ----------------- Multi-case Excel Export Utility -----------------
+
+INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def build_case(name, raw_request, raw_newpro, raw_online):
+    """เปรียบเทียบ 1 เคส และเก็บข้อมูลทั้งหมดที่ต้องใช้ตอนเขียนลง sheet"""
+    return build_case_from_data(name, raw_request, json.loads(raw_newpro), json.loads(raw_online))
+
+
+def build_case_from_data(name, raw_request, newpro_obj, online_obj):
+    """
+    เหมือน build_case แต่รับ JSON ที่ parse แล้ว (newpro_obj / online_obj จะถูกกรองแบบ in-place)
+    เก็บข้อมูลที่กรองแล้วไว้ใน "base_data" / "compare_data" เพื่อใช้ต่อโดยไม่ต้อง parse ซ้ำ
+    """
+    if not isinstance(newpro_obj, dict) or not isinstance(online_obj, dict):
+        raise ValueError("LP และ Pro Engine ต้องเป็น JSON object")
+    res_newpro_text = json.dumps(newpro_obj, ensure_ascii=False, indent=2)
+    res_online_text = json.dumps(online_obj, ensure_ascii=False, indent=2)
+    base_filtered = prepare_compare_data(newpro_obj)
+    compare_filtered = prepare_compare_data(online_obj)
+    partial_base_result, partial_compare_result, total_diff_paths = compute_diff_results(base_filtered, compare_filtered)
+    return {
+        "name": name,
+        "raw_request": raw_request,
+        "res_newpro_text": res_newpro_text,
+        "res_online_text": res_online_text,
+        "base_data": base_filtered,
+        "compare_data": compare_filtered,
+        "base_text": format_full_output(partial_base_result),
+        "compare_text": format_full_output(partial_compare_result),
+        "diff_count": len(total_diff_paths),
+    }
+
+
+def safe_sheet_title(name, used):
+    # Excel: ห้ามมี []:*?/\ และยาวได้ไม่เกิน 31 ตัวอักษร
+    base = INVALID_SHEET_CHARS.sub("_", str(name)).strip("'").strip() or "Case"
+    title = base[:31]
+    n = 2
+    while title.lower() in used:
+        suffix = f" ({n})"
+        title = base[:31 - len(suffix)] + suffix
+        n += 1
+    used.add(title.lower())
+    return title
+
+
+def write_case_sheet(ws, case, diff_fill, align_top_wrap, input_align):
+    # layout เดียวกับ export_to_excel แต่เขียนแบบ append ทีละแถว (write-only)
+    for col in ("A", "B", "C"):
+        ws.column_dimensions[col].width = 80
+    ws.row_dimensions[2].height = 140
+
+    def styled(value, alignment=None, fill=None):
+        cell = WriteOnlyCell(ws, value=value)
+        if alignment is not None:
+            cell.alignment = alignment
+        if fill is not None:
+            cell.fill = fill
+        return cell
+
+    ws.append(["Request_Promotion", "Newproengine_Response", "LP_Response"])
+    ws.append([
+        styled(case["raw_request"], input_align),
+        styled(case["res_online_text"], input_align),
+        styled(case["res_newpro_text"], input_align),
+    ])
+    ws.append([""])
+    ws.append([None, "Newproengine_Diffrent", "LP_Diffrent"])
+
+    for b_block, c_block in pair_promos(case["base_text"].splitlines(), case["compare_text"].splitlines()):
+        for val_b, val_c in iter_aligned_lines(b_block, c_block):
+            is_diff = val_b.strip() != val_c.strip()
+            ws.append([
+                None,
+                styled(val_c, align_top_wrap, diff_fill if is_diff and val_c.strip() else None),
+                styled(val_b, align_top_wrap, diff_fill if is_diff and val_b.strip() else None),
+            ])
+
+
+def export_cases_to_excel(cases, excel_path):
+    """
+    เขียนหลายเคสลง workbook เดียว: sheet "Index" (จำนวน diff + ลิงก์ไปแต่ละ sheet)
+    ตามด้วย 1 sheet ต่อเคส ใช้ write-only mode และ save ครั้งเดียว
+    """
+    diff_fill = PatternFill(start_color="FF9900", end_color="FF9900", fill_type="solid")
+    align_top_wrap = Alignment(vertical="top", wrap_text=True)
+    input_align = Alignment(vertical="top", horizontal="left", wrap_text=True)
+    link_font = Font(color="0563C1", underline="single")
+
+    wb = Workbook(write_only=True)
+    ws_index = wb.create_sheet("Index")
+    ws_index.column_dimensions["A"].width = 50
+    ws_index.column_dimensions["B"].width = 15
+    ws_index.append(["Case", "Differences"])
+
+    used = {"index"}
+    for case in cases:
+        title = safe_sheet_title(case["name"], used)
+        write_case_sheet(wb.create_sheet(title), case, diff_fill, align_top_wrap, input_align)
+
+        link = WriteOnlyCell(ws_index, value=case["name"])
+        link.hyperlink = Hyperlink(ref="", location="'{}'!A1".format(title.replace("'", "''")))
+        link.font = link_font
+        count = WriteOnlyCell(ws_index, value=case["diff_count"])
+        if case["diff_count"]:
+            count.fill = diff_fill
+        ws_index.append([link, count])
+
+    wb.save(excel_path)
+    return excel_path
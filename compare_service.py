@@ -0,0 +1,361 @@
+import argparse
+import io
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ----------------- Worker (รันใน process ของ pool) -----------------
+# import compare_engine (deepdiff / openpyxl / numpy) ครั้งเดียวตอนเริ่ม worker
+# request ถัด ๆ ไปจึงไม่ต้องเสียเวลา import/setup ซ้ำ
+
+engine = None
+
+def init_worker():
+    global engine
+    import compare_engine
+    engine = compare_engine
+
+def warm_up(_=None):
+    return engine is not None
+
+def to_raw_text(value):
+    # request เก็บไว้แสดงใน Excel เท่านั้น รับได้ทั้ง JSON object และ string
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    return json.dumps(value, ensure_ascii=False)
+
+def build_case_from_payload(payload, default_name="Case"):
+    # payload ผ่าน validate_case() แล้ว: lp / pro_engine เป็น dict เสมอ
+    return engine.build_case_from_data(
+        payload.get("name") or default_name,
+        to_raw_text(payload.get("request")),
+        payload["lp"],
+        payload["pro_engine"],
+    )
+
+def run_compare(payload):
+    case = build_case_from_payload(payload)
+    records = list(engine.iter_diff_records(case["base_data"], case["compare_data"]))
+    return {
+        "name": case["name"],
+        "diff_count": case["diff_count"],
+        "lp_diff": case["base_text"],
+        "pro_engine_diff": case["compare_text"],
+        "records": records,
+    }
+
+def run_jsonl(job):
+    # job = (payload, default_name, run_id) เพราะ pool ส่ง argument ได้ตัวเดียว
+    payload, default_name, run_id = job
+    case = build_case_from_payload(payload, default_name)
+    buffer = io.StringIO()
+    engine.write_diff_jsonl(buffer, case["base_data"], case["compare_data"],
+                            case_name=case["name"], run_id=run_id)
+    return buffer.getvalue().encode("utf-8")
+
+def run_export(cases):
+    built = [build_case_from_payload(c, f"Case {i + 1}") for i, c in enumerate(cases)]
+    buffer = io.BytesIO()
+    engine.export_cases_to_excel(built, buffer)
+    return buffer.getvalue()
+
+# ----------------- Input Validation (ตรวจก่อนส่งเข้า pool) -----------------
+
+def load_side(value, label):
+    # รับได้ทั้ง JSON object และ string ของ JSON object
+    if isinstance(value, str):
+        value = json.loads(value)
+    if not isinstance(value, dict):
+        raise ValueError(f'"{label}" must be a JSON object.')
+    return value
+
+def validate_case(case):
+    if not isinstance(case, dict):
+        raise ValueError("Each case must be a JSON object.")
+    name = case.get("name")
+    if name is not None and not isinstance(name, (str, int)):
+        raise ValueError('"name" must be a string.')
+    return {
+        "name": str(name) if name is not None else None,
+        "request": case.get("request"),
+        "lp": load_side(case.get("lp"), "lp"),
+        "pro_engine": load_side(case.get("pro_engine"), "pro_engine"),
+    }
+
+def validate_cases(payload):
+    cases = payload.get("cases")
+    if cases is None:
+        return [validate_case(payload)]
+    if not isinstance(cases, list) or not cases:
+        raise ValueError('"cases" must be a non-empty list of JSON objects.')
+    return [validate_case(c) for c in cases]
+
+# ----------------- Metrics -----------------
+
+class Metrics:
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window)  # วินาที, เก็บเฉพาะ request ล่าสุด
+
+    def record(self, seconds, ok):
+        with self.lock:
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+            self.latencies.append(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            uptime = time.time() - self.started
+            latencies = sorted(self.latencies)
+            requests, errors = self.requests, self.errors
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+        return {
+            "uptime_seconds": round(uptime, 3),
+            "requests": requests,
+            "errors": errors,
+            "throughput_per_second": round(requests / uptime, 3) if uptime else 0.0,
+            "latency_ms": {
+                "avg": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+                "p50": round(percentile(0.50), 3),
+                "p95": round(percentile(0.95), 3),
+                "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            },
+        }
+
+# ----------------- HTTP Service -----------------
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+class CompareHandler(BaseHTTPRequestHandler):
+    # server.pool, server.pool_lock, server.metrics, server.workers ถูกกำหนดใน create_server()
+    # HTTP/1.1 เพื่อให้ส่ง JSONL แบบ Transfer-Encoding: chunked ได้
+    protocol_version = "HTTP/1.1"
+
+    def send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_xlsx(self, data):
+        self.send_response(200)
+        self.send_header("Content-Type", XLSX_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def write_chunk(self, data):
+        # chunk ว่างคือจุดจบของ stream จึงข้ามไป (เคสที่ไม่มี diff)
+        if data:
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    def send_jsonl(self, chunks):
+        """
+        ส่ง JSONL แบบ chunked ทีละเคสทันทีที่ worker คำนวณเสร็จ
+        error ก่อนได้ผลเคสแรกจะโยนต่อให้ do_POST ตอบเป็น JSON error ตามปกติ
+        """
+        chunks = iter(chunks)
+        first = next(chunks, b"")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            self.write_chunk(first)
+            for chunk in chunks:
+                self.write_chunk(chunk)
+        except Exception as e:
+            # ส่ง header ไปแล้ว: ปิด connection โดยไม่ส่ง chunk สุดท้าย ให้ client รู้ว่าข้อมูลไม่ครบ
+            self.close_connection = True
+            self.log_error("JSONL stream aborted: %s", e)
+            return False
+        self.wfile.write(b"0\r\n\r\n")
+        return True
+
+    def read_payload(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(payload, dict):
+            raise ValueError("Request body must be a JSON object.")
+        return payload
+
+    def do_GET(self):
+        if self.path == "/health":
+            status = pool_status(self.server)
+            self.send_json(200 if status != "broken" else 503, {
+                "status": status,
+                "workers": self.server.workers,
+                "pool_restarts": self.server.pool_restarts,
+            })
+        elif self.path == "/metrics":
+            data = self.server.metrics.snapshot()
+            data["workers"] = self.server.workers
+            data["pool_restarts"] = self.server.pool_restarts
+            self.send_json(200, data)
+        else:
+            self.send_json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path not in ("/compare", "/export"):
+            # body ยังไม่ได้อ่าน จึงใช้ connection นี้ต่อไม่ได้
+            self.close_connection = True
+            self.send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+
+        start = time.perf_counter()
+        ok = False
+        try:
+            payload = self.read_payload()
+            if payload.get("format") == "jsonl":
+                run_id = datetime.now().isoformat(timespec="seconds")
+                if self.path == "/export":
+                    jobs = [(c, f"Case {i + 1}", run_id) for i, c in enumerate(validate_cases(payload))]
+                else:
+                    jobs = [(validate_case(payload), "Case", run_id)]
+                ok = self.send_jsonl(iter_in_pool(self.server, run_jsonl, jobs))
+            elif self.path == "/compare" and payload.get("format") != "xlsx":
+                case = validate_case(payload)
+                result = run_in_pool(self.server, run_compare, case)
+                self.send_json(200, result)
+                ok = True
+            else:
+                cases = validate_cases(payload) if self.path == "/export" else [validate_case(payload)]
+                result = run_in_pool(self.server, run_export, cases)
+                self.send_xlsx(result)
+                ok = True
+        except ValueError as e:  # รวม json.JSONDecodeError
+            self.send_json(400, {"error": f"Invalid input: {e}"})
+        except BrokenProcessPool as e:
+            self.send_json(503, {"error": f"Worker pool unavailable: {e}"})
+        except Exception as e:
+            self.send_json(500, {"error": str(e)})
+        finally:
+            self.server.metrics.record(time.perf_counter() - start, ok)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+# ----------------- Worker Pool -----------------
+
+HEALTH_TIMEOUT = 2.0  # วินาที
+
+def start_pool(workers):
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+    # ปลุก worker ทุกตัวให้พร้อมก่อนรับ request แรก
+    list(pool.map(warm_up, range(workers)))
+    return pool
+
+def restart_pool(server, broken_pool):
+    # หลาย request อาจเจอ pool เสียพร้อมกัน ให้สร้างใหม่แค่ครั้งเดียว
+    with server.pool_lock:
+        if server.pool is broken_pool:
+            broken_pool.shutdown(wait=False, cancel_futures=True)
+            server.pool = start_pool(server.workers)
+            server.pool_restarts += 1
+
+def run_in_pool(server, fn, arg):
+    """ส่งงานเข้า pool ถ้า worker ตาย (BrokenProcessPool) จะสร้าง pool ใหม่แล้วลองอีกครั้ง"""
+    pool = server.pool
+    try:
+        return pool.submit(fn, arg).result()
+    except BrokenProcessPool:
+        restart_pool(server, pool)
+        return server.pool.submit(fn, arg).result()
+
+def iter_in_pool(server, fn, args):
+    """
+    ส่งทุกงานเข้า pool พร้อมกัน แล้วคืนผลทีละงานตามลำดับ (ไม่ต้องรอให้ครบทุกงาน)
+    ถ้า pool เสียระหว่างทาง จะสร้างใหม่แล้วส่งงานที่เหลือซ้ำได้หนึ่งครั้งเหมือน run_in_pool
+    """
+    pool = server.pool
+    retried = False
+    futures = []
+    index = 0
+    while index < len(args):
+        try:
+            if not futures:
+                futures = [pool.submit(fn, arg) for arg in args[index:]]
+            result = futures.pop(0).result()
+        except BrokenProcessPool:
+            if retried:
+                raise
+            retried = True
+            restart_pool(server, pool)
+            pool = server.pool
+            futures = []
+            continue
+        index += 1
+        yield result
+
+def pool_status(server):
+    try:
+        server.pool.submit(warm_up).result(timeout=HEALTH_TIMEOUT)
+        return "ok"
+    except BrokenProcessPool:
+        return "broken"
+    except FutureTimeoutError:
+        return "busy"
+
+
+def create_server(host="127.0.0.1", port=8765, workers=2, quiet=False):
+    """สร้าง server พร้อม worker pool ที่ import engine ไว้แล้ว (port=0 = เลือก port ว่างให้อัตโนมัติ)"""
+    pool = start_pool(workers)
+
+    server = ThreadingHTTPServer((host, port), CompareHandler)
+    server.pool = pool
+    server.pool_lock = threading.Lock()
+    server.pool_restarts = 0
+    server.metrics = Metrics()
+    server.workers = workers
+    server.quiet = quiet
+    return server
+
+
+def shutdown_server(server):
+    """หยุดรับ request แล้วปิด worker pool (ใช้คู่กับ serve_forever ที่รันใน thread อื่น)"""
+    server.shutdown()
+    server.server_close()
+    server.pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local JSON compare service (LP vs Pro Engine)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.workers)
+    print(f"🔍 Compare service on http://{args.host}:{server.server_address[1]} ({args.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
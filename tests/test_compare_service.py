@@ -0,0 +1,110 @@
+import io
+import json
+import sys
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+from openpyxl import load_workbook
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from compare_service import create_server, shutdown_server  # noqa: E402
+
+SAMPLE_DIR = ROOT / "Json_res_EXP"
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = create_server(port=0, workers=1, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    shutdown_server(server)
+    thread.join(timeout=10)
+
+
+@pytest.fixture(scope="module")
+def sample_case():
+    return {
+        "name": "EXP",
+        "request": {"sample": "Json_res_EXP"},
+        "lp": json.loads((SAMPLE_DIR / "NewPro.json").read_text(encoding="utf-8")),
+        "pro_engine": json.loads((SAMPLE_DIR / "Onlinepro.json").read_text(encoding="utf-8")),
+    }
+
+
+def post(base_url, path, body):
+    data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+    request = urllib.request.Request(
+        base_url + path, data=data, headers={"Content-Type": "application/json"}, method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def get_json(base_url, path):
+    with urllib.request.urlopen(base_url + path, timeout=60) as response:
+        return response.status, json.loads(response.read())
+
+
+def test_health(base_url):
+    status, data = get_json(base_url, "/health")
+    assert status == 200
+    assert data["status"] == "ok"
+    assert data["workers"] == 1
+
+
+def test_compare_sample(base_url, sample_case):
+    status, _, body = post(base_url, "/compare", sample_case)
+    assert status == 200
+    result = json.loads(body)
+    assert result["name"] == "EXP"
+    assert result["diff_count"] == 230
+    assert result["records"]
+
+
+def test_compare_jsonl_stream(base_url, sample_case):
+    status, headers, body = post(base_url, "/compare", dict(sample_case, format="jsonl"))
+    assert status == 200
+    assert headers["Content-Type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert records
+    assert all(r["case"] == "EXP" and "root" in r and "patch" in r for r in records)
+
+
+def test_export_workbook(base_url, sample_case):
+    second = dict(sample_case, name="EXP copy")
+    status, headers, body = post(base_url, "/export", {"cases": [sample_case, second]})
+    assert status == 200
+    assert headers["Content-Type"].startswith("application/vnd.openxmlformats")
+    workbook = load_workbook(io.BytesIO(body))
+    assert workbook.sheetnames == ["Index", "EXP", "EXP copy"]
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/compare", {"lp": [1, 2], "pro_engine": {}}),
+    ("/compare", [1, 2]),
+    ("/compare", b"{not json"),
+    ("/export", {"cases": []}),
+])
+def test_bad_input_returns_400(base_url, path, body):
+    status, _, response = post(base_url, path, body)
+    assert status == 400
+    assert json.loads(response)["error"].startswith("Invalid input")
+
+
+def test_metrics_count_requests(base_url, sample_case):
+    _, before = get_json(base_url, "/metrics")
+    post(base_url, "/compare", sample_case)
+    post(base_url, "/compare", [1, 2])
+    _, after = get_json(base_url, "/metrics")
+    assert after["requests"] == before["requests"] + 2
+    assert after["errors"] == before["errors"] + 1
+    assert after["latency_ms"]["max"] > 0